@@ -0,0 +1,61 @@
+"""
+Numba kernels for unpacking BlockStates, used by :func:`anvil.utils.unpack_states`
+when numba is installed (``pip install anvil-parser[fast]``)
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+def decode_packed(states: np.ndarray, bits: int) -> np.ndarray:
+    """
+    Unpacks 20w17a and newer BlockStates, where each long is padded
+    instead of an index being split between two longs
+
+    Parameters
+    ----------
+    states
+        BlockStates as ``uint64``
+    bits
+        How many bits each palette index takes
+    """
+    out = np.empty(4096, np.uint16)
+    bits_mask = np.uint64((1 << bits) - 1)
+    per_long = 64 // bits
+    for index in range(4096):
+        shift = np.uint64(index % per_long * bits)
+        out[index] = (states[index // per_long] >> shift) & bits_mask
+    return out
+
+def decode_stretched(states: np.ndarray, bits: int) -> np.ndarray:
+    """
+    Unpacks pre-20w17a BlockStates, where an index can be split between two longs
+
+    Parameters
+    ----------
+    states
+        BlockStates as ``uint64``
+    bits
+        How many bits each palette index takes
+    """
+    out = np.empty(4096, np.uint16)
+    bits_mask = np.uint64((1 << bits) - 1)
+    for index in range(4096):
+        bit_pos = index * bits
+        word = bit_pos // 64
+        shift = bit_pos % 64
+        value = states[word] >> np.uint64(shift)
+        # the rest of the bits are at the start of the next long
+        if shift + bits > 64:
+            value |= states[word + 1] << np.uint64(64 - shift)
+        out[index] = value & bits_mask
+    return out
+
+if NUMBA_AVAILABLE:
+    # nogil lets sections be decoded in parallel from a thread pool
+    decode_packed = njit(cache=True, nogil=True)(decode_packed)
+    decode_stretched = njit(cache=True, nogil=True)(decode_stretched)
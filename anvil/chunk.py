@@ -1,9 +1,11 @@
+from collections import namedtuple
 from collections.abc import Generator
 from nbt import nbt
+import numpy as np
 from .block import Block, OldBlock
 from .region import Region
 from .errors import OutOfBoundsCoordinates, ChunkNotFound, EmptyRegionFile
-from .utils import bin_append, nibble
+from .utils import bin_append, unpack_states
 
 # Last Checked Version: 1.20.2-rc2
 # ----------------------------------------------------------------------------------------------------
@@ -64,6 +66,15 @@ _VERSION_17w47a = 1451
 # Data versions were introduced with 15w32a (1.9 snapshot) and started at 100
 # _VERSION_12w07a = -1
 
+# Masking a long with this makes it unsigned, the same as adding 2^64 to negative ones
+_U64_MASK = 0xFFFFFFFFFFFFFFFF
+
+# _MASKS[n] keeps the n least significant bits of a number
+_MASKS = tuple((1 << n) - 1 for n in range(65))
+
+# What's needed to read blocks out of a section's BlockStates, see Chunk._section_handle
+_SectionHandle = namedtuple('_SectionHandle', ('section', 'states', 'palette', 'bits', 'bits_mask', 'per_long', 'stretches'))
+
 class Chunk:
     """
     Represents a chunk from a ``.mca`` file.
@@ -81,7 +92,7 @@ class Chunk:
     highest_y: :class:`int`
         Chunk's highest Y position
     version: :class:`int`
-        Version of the chunk NBT structure
+        Version of the chunk NBT structure, ``0`` if the chunk predates data versions (15w32a)
     data: :class:`nbt.TAG_Compound`
         Raw NBT data of the chunk
     guessed_type: :class:`string`
@@ -91,7 +102,8 @@ class Chunk:
     entities: :class:`nbt.TAG_Compound`
         ``self.data['Entities']`` as an attribute for easier use (or ``self.data['block_entities']`` if chunk's world's version is at least 21w43a)
     """
-    __slots__ = ('version', 'data', 'x', 'z', 'lowest_y', 'highest_y', 'block_entities', 'tile_entities')
+    __slots__ = ('version', 'data', 'x', 'z', 'lowest_y', 'highest_y', 'block_entities', 'tile_entities', '_section_cache', '_section_by_y',
+                 '_block_entity_index', '_v_21w43a', '_v_21w39a', '_v_20w17a', '_v_17w47a')
 
     def __init__(self, nbt_data: nbt.NBTFile):
         try:
@@ -99,10 +111,23 @@ class Chunk:
         except KeyError:
             # Version is pre-1.9 snapshot 15w32a, so world does not have a Data Version.
             # See https://minecraft.wiki/w/Data_version
-            self.version = None
+            # 0 is lower than any data version, so it goes through the oldest format's code
+            self.version = 0
+
+        # The version can't change, so check which format changes apply only once
+        self._v_21w43a = self.version >= _VERSION_21w43a
+        self._v_21w39a = self.version >= _VERSION_21w39a
+        self._v_20w17a = self.version >= _VERSION_20w17a
+        self._v_17w47a = self.version >= _VERSION_17w47a
 
         self.data = nbt_data
 
+        # Resolved block states and palettes by section, see _section_handle
+        self._section_cache: dict[int, _SectionHandle] = {}
+
+        # Sections by their Y index, built on the first get_section call
+        self._section_by_y: dict[int, nbt.TAG_Compound] | None = None
+
         # Base data expected to be in any region file (citation needed)
         self.x = self.data['Level']['xPos'].value
         self.z = self.data['Level']['zPos'].value
@@ -120,7 +145,7 @@ class Chunk:
         # We may be reading a chunk that holds entities or something else,
         #   so block entities may not exist in this data
         try:
-            if self.version and self.version >= _VERSION_21w43a:
+            if self._v_21w43a:
                 self.data = nbt_data
                 self.tile_entities = self.data['block_entities']
             else:
@@ -133,9 +158,12 @@ class Chunk:
         # to match the rename. we aren't getting rid of tile_entities, just making sure there's a match with the modern term
         self.block_entities = self.tile_entities
 
+        # Block entities by their coordinates, built on the first get_block_entity call
+        self._block_entity_index: dict[tuple[int, int, int], nbt.TAG_Compound] | None = None
+
     def init_entities(self, nbt_data: nbt.NBTFile):
         try:
-            if self.version and self.version >= _VERSION_21w43a:
+            if self._v_21w43a:
                 self.data = nbt_data
                 self.tile_entities = self.data['block_entities']
             else:
@@ -148,16 +176,21 @@ class Chunk:
         # to match the rename. we aren't getting rid of tile_entities, just making sure there's a match with the modern term
         self.block_entities = self.tile_entities
 
+        # Block entities by their coordinates, built on the first get_block_entity call
+        self._block_entity_index: dict[tuple[int, int, int], nbt.TAG_Compound] | None = None
+
+    def _get_sections(self) -> nbt.TAG_List | None:
+        """Returns the chunk's list of sections, or ``None`` if it has none"""
+        if self._v_21w43a:
+            return self.data.get('sections')
+        return self.data.get('Sections')
+
     def get_lowest_section(self) -> int | None:
-        try:
-            if self.version and self.version >= _VERSION_21w43a:
-                sections = self.data['sections']
-            else:
-                sections = self.data['Sections']
-        except KeyError:
+        sections = self._get_sections()
+        if sections is None:
             return None
 
-        if self.version and self.version >= _VERSION_21w43a:
+        if self._v_21w43a:
             return self.data['yPos'].value
 
         if len(sections) < 1:
@@ -166,12 +199,8 @@ class Chunk:
         return sections[0]['Y'].value
 
     def get_highest_section(self) -> int | None:
-        try:
-            if self.version and self.version >= _VERSION_21w43a:
-                sections = self.data['sections']
-            else:
-                sections = self.data['Sections']
-        except KeyError:
+        sections = self._get_sections()
+        if sections is None:
             return None
 
         if len(sections) < 1:
@@ -197,19 +226,12 @@ class Chunk:
         if (self.lowest_y and y < self.lowest_y) or (self.highest_y and y > self.highest_y):
             raise OutOfBoundsCoordinates(f'Y ({y!r}) must be in range of {self.lowest_y!r} to {self.highest_y!r}')
 
-        try:
-            # print("Data: %s" % self.data)
-
-            if self.version and self.version >= _VERSION_21w43a:
-                sections = self.data['sections']
-            else:
-                sections = self.data['Sections']
-        except KeyError:
-            return None
+        if self._section_by_y is None:
+            self._section_by_y = {}
+            for section in self._get_sections() or ():
+                self._section_by_y.setdefault(section['Y'].value, section)
 
-        for section in sections:
-            if section['Y'].value == y:
-                return section
+        return self._section_by_y.get(y)
 
     def get_palette(self, section: int | nbt.TAG_Compound) -> tuple[Block, ...] | None:
         """
@@ -227,19 +249,91 @@ class Chunk:
         if section is None:
             return None
 
-        # print("Section: %s" % section)
-        if self.version and self.version >= _VERSION_21w39a:
-            palette_parent = section['block_states']
+        handle = self._section_handle(section)
+        if handle is None:
+            return None
+        return handle.palette
+
+    def get_palette_soa(self, section: int | nbt.TAG_Compound) -> dict[str, np.ndarray | list[dict]] | None:
+        """
+        Returns the block palette for given section as parallel arrays,
+        which can be searched at once with numpy instead of going through each block
+
+        Combined with :meth:`get_section_ids`, finding every chest in a section becomes::
+
+            ids, _ = chunk.get_section_ids(section)
+            palette = chunk.get_palette_soa(section)
+            chests = np.isin(ids, np.flatnonzero(palette['name'] == 'minecraft:chest'))
+
+        Parameters
+        ----------
+        section
+            Either a section NBT tag or an index
+
+        Returns
+        -------
+        dict
+            ``name``: :class:`numpy.ndarray` of each block's ``namespace:block_id``,
+            ``properties``: list of each block's properties
+        """
+        palette = self.get_palette(section)
+        if palette is None:
+            return None
+
+        return {
+            'name': np.array([block.name() for block in palette], dtype=object),
+            'properties': [block.properties for block in palette],
+        }
+
+    def _section_handle(self, section: nbt.TAG_Compound) -> _SectionHandle | None:
+        """
+        Returns the section's block states, decoded palette and how to index them,
+        resolving them only the first time the section is seen
+
+        Returns ``None`` if the section has no block states
+        """
+        handle = self._section_cache.get(id(section))
+        # the section is kept in the handle so its id can't be reused by another object
+        if handle is not None and handle.section is section:
+            return handle
+
+        # Confirmed: 21w39a moved BlockStates & Palette to block_states container structure
+        # Source: https://feedback.minecraft.net/hc/en-us/articles/4410294651405-Minecraft-Java-Edition-Snapshot-21w39a
+        if self._v_21w39a:
+            palette_parent = section.get('block_states')
+            if palette_parent is None:
+                return None
+            states_tag = palette_parent.get('data')
         else:
             palette_parent = section
+            states_tag = section.get('BlockStates')
+            if states_tag is None:
+                return None
 
-        if self.version and self.version >= _VERSION_21w43a:
+        if self._v_21w43a:
             palette_tag = 'palette'
         else:
             palette_tag = 'Palette'
 
-        # print("palette_parent: %s" % palette_parent)
-        return tuple(Block.from_palette(i) for i in palette_parent[palette_tag])
+        # every block in a section is one of a few palette entries, so only decode those once
+        palette = tuple(Block.from_palette(i) for i in palette_parent[palette_tag])
+
+        # Number of bits each block is on BlockStates
+        # Cannot be lower than 4
+        bits = max((len(palette) - 1).bit_length(), 4)
+
+        handle = _SectionHandle(
+            section=section,
+            states=states_tag.value if states_tag is not None else None,
+            palette=palette,
+            bits=bits,
+            bits_mask=_MASKS[bits],
+            per_long=64 // bits,
+            # in 20w17a and newer blocks cannot occupy more than one element on the BlockStates array
+            stretches=not self._v_20w17a
+        )
+        self._section_cache[id(section)] = handle
+        return handle
 
     def get_block(self, x: int, y: int, z: int, section: int | nbt.TAG_Compound | None = None, force_new: bool=False) -> Block | OldBlock | None:
         """
@@ -277,7 +371,7 @@ class Chunk:
             # global Y to section Y
             y %= 16
 
-        if self.version is None or self.version < _VERSION_17w47a:
+        if not self._v_17w47a:
             # Explained in depth here https://minecraft.gamepedia.com/index.php?title=Chunk_format&oldid=1153403#Block_format
             if section is None:
                 if force_new:
@@ -296,11 +390,15 @@ class Chunk:
 
             index = y * 16 * 16 + z * 16 + x
 
+            # nibble() inlined, odd indices are the high 4 bits, even indices the low 4 bits
+            nibble_shift = (index & 1) << 2
+
             block_id = section['Blocks'][index]
-            if 'Add' in section:
-                block_id += nibble(section['Add'], index) << 8
+            add = section.get('Add')
+            if add is not None:
+                block_id += ((add[index >> 1] >> nibble_shift) & 0xF) << 8
 
-            block_data = nibble(section['Data'], index)
+            block_data = (section['Data'][index >> 1] >> nibble_shift) & 0xF
             block = OldBlock(block_id, block_data)
 
             if force_new:
@@ -315,77 +413,44 @@ class Chunk:
         if section is None:
             return None
 
-        block_states_tag = 'block_states'
-        if self.version >= _VERSION_21w39a:
-            palette_parent = section[block_states_tag]
-        else:
-            block_states_tag = 'BlockStates'
-            palette_parent = section
-
-        if self.version >= _VERSION_21w43a:
-            palette_tag = 'palette'
-        else:
-            palette_tag = 'Palette'
+        handle = self._section_handle(section)
 
         # If its an empty section its most likely an air block
-        # print("Section: %s" % section)
-        if section is None or block_states_tag not in section:
+        if handle is None:
             return Block.from_name('minecraft:air')
 
-        # Number of bits each block is on BlockStates
-        # Cannot be lower than 4
-        if self.version >= _VERSION_21w39a:
-            bits = max((len(section[block_states_tag][palette_tag]) - 1).bit_length(), 4)
-        else:
-            bits = max((len(section[palette_tag]) - 1).bit_length(), 4)
-
-        # Get index on the block list with the order YZX
-        index = y * 16*16 + z * 16 + x
+        # The whole section is a single block, 21w39a and newer don't even save the data for it
+        if handle.states is None or len(handle.palette) == 1:
+            return handle.palette[0]
 
         # BlockStates is an array of 64 bit numbers
         # that holds the blocks index on the palette list
-        # Confirmed: 21w39a moved BlockStates & Palette to block_states container structure
-        # Source: https://feedback.minecraft.net/hc/en-us/articles/4410294651405-Minecraft-Java-Edition-Snapshot-21w39a
-        if self.version >= _VERSION_21w39a:
-            # If its an empty section its most likely an air block
-            if 'data' not in section[block_states_tag]:
-                return Block.from_name('minecraft:air')
-
-            states = section[block_states_tag]['data'].value
-        else:
-            states = section[block_states_tag].value
-        # print("States: %s" % states)
+        states = handle.states
+        bits = handle.bits
+        stretches = handle.stretches
 
-        # in 20w17a and newer blocks cannot occupy more than one element on the BlockStates array
-        stretches = self.version is None or self.version < _VERSION_20w17a
-        # stretches = True
+        # Get index on the block list with the order YZX
+        index = y * 16*16 + z * 16 + x
 
         # get location in the BlockStates array via the index
         if stretches:
             state = index * bits // 64
         else:
-            state = index // (64 // bits)
+            state = index // handle.per_long
 
         # makes sure the number is unsigned
-        # by adding 2^64
-        # could also use ctypes.c_ulonglong(n).value but that'd require an extra import
-        # print("State: %s" % state)
-        data = states[state]
-        if data < 0:
-            data += 2**64
+        data = states[state] & _U64_MASK
 
         if stretches:
             # shift the number to the right to remove the left over bits
             # and shift so the i'th block is the first one
             shifted_data = data >> ((bits * index) % 64)
         else:
-            shifted_data = data >> (index % (64 // bits) * bits)
+            shifted_data = data >> (index % handle.per_long * bits)
 
         # if there aren't enough bits it means the rest are in the next number
         if stretches and 64 - ((bits * index) % 64) < bits:
-            data = states[state + 1]
-            if data < 0:
-                data += 2**64
+            data = states[state + 1] & _U64_MASK
 
             # get how many bits are from a palette index of the next block
             leftover = (bits - ((state + 1) * 64 % bits)) % bits
@@ -395,15 +460,55 @@ class Chunk:
             # Next state                Current state (already shifted)
             # 0b101010110101101010010   0b01
             # will result in bin_append(0b010, 0b01, 2) = 0b01001
-            shifted_data = bin_append(data & 2**leftover - 1, shifted_data, bits-leftover)
+            shifted_data = bin_append(data & _MASKS[leftover], shifted_data, bits-leftover)
 
         # get `bits` least significant bits
         # which are the palette index
-        palette_id = shifted_data & 2**bits - 1
+        palette_id = shifted_data & handle.bits_mask
+
+        return handle.palette[palette_id]
+
+    def get_section_ids(self, section: int | nbt.TAG_Compound) -> tuple[np.ndarray, tuple[Block, ...]] | None:
+        """
+        Returns the palette index of every block in given section, along with the palette
+
+        Much cheaper than :meth:`stream_blocks` when the blocks don't need to be
+        objects, for example to count or look for a block over a whole section.
+        Returns ``None`` if the section is missing, or if the chunk is pre-1.13 and has no palette
+
+        Parameters
+        ----------
+        section
+            Either a Y index or a section NBT tag.
+
+        Returns
+        -------
+        ids : :class:`numpy.ndarray`
+            ``uint16`` array of shape ``(16, 16, 16)`` indexed as ``ids[y, z, x]``
+        palette : tuple[:class:`anvil.Block`]
+            Blocks the indices point to
+        """
+        if not self._v_17w47a:
+            return None
 
-        # print("Block: %s" % palette_parent[palette_tag][palette_id])
-        block = palette_parent[palette_tag][palette_id]
-        return Block.from_palette(block)
+        if isinstance(section, int):
+            section = self.get_section(section)
+
+        if section is None:
+            return None
+
+        handle = self._section_handle(section)
+
+        # If its an empty section its most likely all air
+        if handle is None:
+            return np.zeros((16, 16, 16), np.uint16), (Block.from_name('minecraft:air'),)
+
+        # The whole section is a single block, 21w39a and newer don't even save the data for it
+        if handle.states is None or len(handle.palette) == 1:
+            return np.zeros((16, 16, 16), np.uint16), handle.palette
+
+        ids = unpack_states(handle.states, handle.bits, handle.stretches)
+        return ids.reshape(16, 16, 16), handle.palette
 
     def stream_blocks(
             self, 
@@ -431,33 +536,46 @@ class Chunk:
         Raises
         ------
         anvil.errors.OutOfBoundCoordinates
-            If `section` is not in the range of 0 to 15
+            If `section` is not in the range of the chunk's lowest to highest section
+            (0 to 15 if those aren't known)
 
         Yields
         ------
         :class:`anvil.Block`
         """
-        if isinstance(section, int) and (section < 0 or section > 16):
-            raise OutOfBoundsCoordinates(f'section ({section!r}) must be in range of 0 to 15')
+        if isinstance(section, int):
+            lower_bound, upper_bound = self._section_bounds()
+            if section < lower_bound or section > upper_bound:
+                raise OutOfBoundsCoordinates(f'section ({section!r}) must be in range of {lower_bound!r} to {upper_bound!r}')
 
         # For better understanding of this code, read get_block()'s source
 
         if section is None or isinstance(section, int):
             section = self.get_section(section or 0)
 
-        if self.version and self.version < _VERSION_17w47a:
+        if not self._v_17w47a:
             if section is None or 'Blocks' not in section:
                 air = Block.from_name('minecraft:air') if force_new else OldBlock(0)
                 for _ in range(4096):
                     yield air
                 return
 
+            # Resolve the arrays once instead of going through the NBT tags for every block
+            blocks = section['Blocks'].value
+            data = section['Data'].value
+            add = section.get('Add')
+            if add is not None:
+                add = add.value
+
             while index < 4096:
-                block_id = section['Blocks'][index]
-                if 'Add' in section:
-                    block_id += nibble(section['Add'], index) << 8
+                # nibble() inlined, see get_block()
+                nibble_shift = (index & 1) << 2
+
+                block_id = blocks[index]
+                if add is not None:
+                    block_id += ((add[index >> 1] >> nibble_shift) & 0xF) << 8
 
-                block_data = nibble(section['Data'], index)
+                block_data = (data[index >> 1] >> nibble_shift) & 0xF
 
                 block = OldBlock(block_id, block_data)
                 if force_new:
@@ -475,92 +593,52 @@ class Chunk:
         if section is None:
             return None
 
-        if self.version and self.version >= _VERSION_21w39a:
-            block_states_tag = 'block_states'
-            palette_parent = section[block_states_tag]
-        else:
-            block_states_tag = 'BlockStates'
-            palette_parent = section
-
-        if self.version and self.version >= _VERSION_21w43a:
-            palette_tag = 'palette'
-        else:
-            palette_tag = 'Palette'
+        yield from self._stream_section(section, index)
 
-        if section is None or block_states_tag not in section:
-            air = Block.from_name('minecraft:air')
-            for _ in range(4096):
-                yield air
+    def _stream_section(self, section: nbt.TAG_Compound, index: int) -> Generator[Block, None, None]:
+        """
+        Yields the blocks of a 1.13+ section starting at ``index``,
+        without any of the argument handling of :meth:`stream_blocks`
+        """
+        ids, palette = self.get_section_ids(section)
+        if len(palette) == 1:
+            block = palette[0]
+            for _ in range(4096 - index):
+                yield block
             return
 
-        states = section[block_states_tag].value
-        palette = palette_parent[palette_tag]
-
-        bits = max((len(palette) - 1).bit_length(), 4)
-
-        if self.version:
-            stretches = self.version < _VERSION_20w17a
-        else:
-            stretches = None
-
-        if stretches:
-            state = index * bits // 64
-        else:
-            state = index // (64 // bits)
-
-        data = states[state]
-        if data < 0:
-            data += 2**64
-
-        bits_mask = 2**bits - 1
+        for palette_id in ids.ravel()[index:].tolist():
+            yield palette[palette_id]
 
-        if stretches:
-            offset = (bits * index) % 64
-        else:
-            offset = index % (64 // bits) * bits
-
-        data_len = 64 - offset
-        data >>= offset
-
-        while index < 4096:
-            if data_len < bits:
-                state += 1
-                new_data = states[state]
-                if new_data < 0:
-                    new_data += 2**64
-
-                if stretches:
-                    leftover = data_len
-                    data_len += 64
-
-                    data = bin_append(new_data, data, leftover)
-                else:
-                    data = new_data
-                    data_len = 64
-
-            palette_id = data & bits_mask
-            yield Block.from_palette(palette[palette_id])
-
-            index += 1
-            data >>= bits
-            data_len -= bits
+    def _section_bounds(self) -> tuple[int, int]:
+        """Returns the range of section Y indices stream_blocks and stream_chunk accept"""
+        lower_bound = self.lowest_y if self.lowest_y else 0
+        upper_bound = self.highest_y if self.highest_y else 15
+        return lower_bound, upper_bound
 
     def stream_chunk(self, index: int = 0) -> Generator[Block | OldBlock, None, None]:
         """
         Returns a generator for all the blocks in the chunk
 
-        This is a helper function that runs Chunk.stream_blocks from section 0 to 15
+        This is a helper function that runs Chunk.stream_blocks from the chunk's
+        lowest to highest section (0 to 15 if those aren't known)
 
         Yields
         ------
         :class:`anvil.Block`
         """
-        lower_bound = self.lowest_y if self.lowest_y else 0
-        upper_bound = self.highest_y if self.highest_y else 15
+        lower_bound, upper_bound = self._section_bounds()
 
+        if not self._v_17w47a:
+            for section_y in range(lower_bound, upper_bound + 1):
+                yield from self.stream_blocks(index=index, section=section_y)
+            return
+
+        # Skip stream_blocks' per section checks, they're the same for every section of the chunk
         for section_y in range(lower_bound, upper_bound + 1):
-            for block in self.stream_blocks(index=index, section=section_y):
-                yield block
+            section = self.get_section(section_y)
+            if section is not None:
+                yield from self._stream_section(section, index)
 
     def get_tile_entity(self, x: int, y: int, z: int) -> nbt.TAG_Compound | None:
         return self.get_block_entity(x, y, z)
@@ -571,12 +649,13 @@ class Chunk:
 
         To iterate through all block entities in the chunk, use :class:`Chunk.block_entities`
         """
-        if self.block_entities:
-            for block_entity in self.block_entities:
-                b_x, b_y, b_z = [block_entity[k].value for k in 'xyz']
-                if x == b_x and y == b_y and z == b_z:
-                    return block_entity
-        return None
+        if self._block_entity_index is None:
+            self._block_entity_index = {}
+            for block_entity in self.block_entities or ():
+                key = (block_entity['x'].value, block_entity['y'].value, block_entity['z'].value)
+                self._block_entity_index.setdefault(key, block_entity)
+
+        return self._block_entity_index.get((x, y, z))
 
     @classmethod
     def from_region(cls, region: str | Region, chunk_x: int, chunk_z: int):
@@ -594,7 +673,8 @@ class Chunk:
             If a chunk is outside this region or hasn't been generated yet
         """
         if isinstance(region, str):
-            region = Region.from_file(region)
+            # only the header and this chunk are needed, so don't read the whole file
+            region = Region.from_mmap(region)
         nbt_data = region.chunk_data(chunk_x, chunk_z)
         if nbt_data is None:
             raise ChunkNotFound(f'Could not find chunk ({chunk_x}, {chunk_z})')
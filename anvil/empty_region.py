@@ -216,7 +216,9 @@ class EmptyRegion:
             chunk_data = BytesIO()
             if isinstance(chunk, Chunk):
                 nbt_data = nbt.NBTFile()
-                nbt_data.tags.append(nbt.TAG_Int(name='DataVersion', value=chunk.version))
+                # chunks from before data versions were introduced don't have one
+                if chunk.version:
+                    nbt_data.tags.append(nbt.TAG_Int(name='DataVersion', value=chunk.version))
                 nbt_data.tags.append(chunk.data)
             else:
                 nbt_data = chunk.save()
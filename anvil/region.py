@@ -2,18 +2,37 @@ from pathlib import Path
 from typing import BinaryIO
 from nbt import nbt
 import zlib
+import mmap
 from io import BytesIO
 import anvil
 from .errors import GZipChunkData, EmptyRegionFile, CorruptedData, InvalidFileType
 
+try:
+    # libdeflate bindings, a lot faster than zlib at decompressing
+    import deflate
+except ImportError:
+    deflate = None
+
+# The decompressed size isn't stored in region files, so libdeflate is given a buffer
+# this many times the compressed size and zlib is used for anything that doesn't fit
+_DEFLATE_SIZE_RATIO = 32
+
+def _zlib_decompress(data: bytes) -> bytes:
+    if deflate is not None:
+        try:
+            return deflate.zlib_decompress(data, len(data) * _DEFLATE_SIZE_RATIO)
+        except deflate.DeflateError:
+            pass
+    return zlib.decompress(data)
+
 class Region:
     """
     Read-only region
 
     Attributes
     ----------
-    data: :class:`bytes`
-        Region file (``.mca``) as bytes
+    data: :class:`bytes` | :class:`mmap.mmap`
+        Region file (``.mca``) as bytes, or memory mapped if made with :meth:`from_mmap`
 
     Raises
         ------
@@ -21,7 +40,7 @@ class Region:
             If region file has no data to process
     """
     __slots__ = ('data',)
-    def __init__(self, data: bytes):
+    def __init__(self, data: bytes | mmap.mmap):
         """Makes a Region object from data, which is the region file content"""
         if not data:
             self.data = None
@@ -96,7 +115,11 @@ class Region:
                 raise GZipChunkData('GZip is not supported')
 
             compressed_data = self.data[off + 5 : off + 5 + length - 1]
-            decompressed_data = zlib.decompress(compressed_data)
+            if compression == 3:
+                # uncompressed
+                decompressed_data = compressed_data
+            else:
+                decompressed_data = _zlib_decompress(compressed_data)
         else:
             raise EmptyRegionFile('Region file is empty. There\'s no data to process')
 
@@ -149,3 +172,30 @@ class Region:
                 'message':f"Expected str, Path, or file-like object, got {type(file).__name__}",
                 'data' : file
             })
+
+    @classmethod
+    def from_mmap(cls, file: str | Path) -> 'anvil.Region':
+        """
+        Creates a new region backed by a read-only memory map of the given file,
+        so only the parts of the file that get read (the header and the chunks asked for)
+        are loaded instead of the whole file
+
+        Parameters
+        ----------
+        file
+            File path
+        """
+        if not isinstance(file, (str, Path)):
+            raise InvalidFileType({
+                'message':f"Expected str or Path, got {type(file).__name__}",
+                'data' : file
+            })
+
+        with open(file, 'rb') as f:
+            try:
+                # the map stays valid after the file is closed
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files can't be mapped
+                data = b''
+        return cls(data=data)
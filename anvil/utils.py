@@ -1,4 +1,7 @@
 from struct import Struct
+import functools
+import numpy as np
+from . import _fastdecode
 
 # Dirty mixin to change q to Q
 def _update_fmt(self, length: int) -> None:
@@ -9,8 +12,72 @@ def bin_append(a: int, b: int, length: int | None = None) -> int:
     return (a << length) | b
 
 def nibble(byte_array: bytearray, index: int) -> int:
-    value = byte_array[index // 2]
-    if index % 2:
-        return value >> 4
+    # odd indices are the high 4 bits, even indices the low 4 bits
+    return (byte_array[index >> 1] >> ((index & 1) << 2)) & 0b1111
+
+def unpack_states(states: list[int], bits: int, stretches: bool) -> np.ndarray:
+    """
+    Unpacks a BlockStates long array into the 4096 palette indices of a section,
+    in the order YZX
+
+    Parameters
+    ----------
+    states
+        BlockStates array of signed 64 bit numbers
+    bits
+        How many bits each palette index takes
+    stretches
+        Whether a palette index can be split between two elements of the array (pre-20w17a)
+
+    :rtype: :class:`numpy.ndarray` of ``uint16``
+    """
+    try:
+        # reinterpret the signed longs as unsigned so shifting doesn't carry the sign bit
+        arr = np.asarray(states, dtype=np.int64).view(np.uint64)
+    except OverflowError:
+        # the states were already read as unsigned (see _update_fmt)
+        arr = np.asarray(states, dtype=np.uint64)
+    if _fastdecode.NUMBA_AVAILABLE:
+        if stretches:
+            return _fastdecode.decode_stretched(arr, bits)
+        return _fastdecode.decode_packed(arr, bits)
+
+    word, shift, stitch_index, stitch_word, stitch_shift = _schedule(bits, stretches)
+    ids = arr[word] >> shift
+    # the rest of the bits of a stretched index are at the start of the next element
+    ids[stitch_index] |= arr[stitch_word] << stitch_shift
+
+    return (ids & np.uint64((1 << bits) - 1)).astype(np.uint16)
+
+@functools.lru_cache(maxsize=32)
+def _schedule(bits: int, stretches: bool) -> tuple[np.ndarray, ...]:
+    """
+    Returns where each of the 4096 palette indices of a section is in BlockStates,
+    which only depends on the number of bits per index and whether they stretch
+
+    Returns the element and shift of each index, and for indices split between two elements
+    (only if stretching) their positions, the next element, and the shift of the next element's bits
+    """
+    index = np.arange(4096, dtype=np.uint64)
+
+    if stretches:
+        bit_pos = index * bits
+        word = bit_pos // 64
+        shift = bit_pos % 64
+        stitch_index = np.flatnonzero(shift + bits > 64)
     else:
-        return value & 0b1111
+        per_long = 64 // bits
+        word = index // per_long
+        shift = index % per_long * bits
+        stitch_index = np.empty(0, dtype=np.intp)
+
+    word = word.astype(np.intp)
+    stitch_word = word[stitch_index] + 1
+    # never 64, as an index is only split if it starts after the first bit
+    stitch_shift = 64 - shift[stitch_index]
+
+    schedule = (word, shift, stitch_index, stitch_word, stitch_shift)
+    # shared by every call with the same bits, so make sure nobody changes them
+    for arr in schedule:
+        arr.flags.writeable = False
+    return schedule
@@ -12,7 +12,7 @@ setuptools.setup(
     long_description_content_type='text/markdown',
     url='https://github.com/matcool/anvil-parser',
     packages=setuptools.find_packages(),
-    python_requires=">=3.10"
+    python_requires=">=3.10",
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
@@ -21,6 +21,10 @@ setuptools.setup(
     install_requires=[
         'nbt',
         'frozendict',
+        'numpy',
     ],
+    extras_require={
+        'fast': ['numba', 'deflate'],
+    },
     include_package_data=True
 )
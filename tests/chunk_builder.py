@@ -0,0 +1,85 @@
+import context as _
+from nbt import nbt
+from anvil import Chunk
+
+# Helpers for building chunk NBT by hand, for formats EmptyChunk can't save
+
+def _byte_array(name: str, value: bytearray) -> nbt.TAG_Byte_Array:
+    tag = nbt.TAG_Byte_Array(name=name)
+    tag.value = value
+    return tag
+
+def _nibbles(values: list[int]) -> bytearray:
+    return bytearray(values[i] | values[i + 1] << 4 for i in range(0, 4096, 2))
+
+def legacy_section(y: int, block_ids: list[int], block_data: list[int], add_ids: list[int] | None = None) -> nbt.TAG_Compound:
+    """Builds a pre-flattening section from 4096 numeric ids, data values and optionally Add values"""
+    section = nbt.TAG_Compound()
+    section.tags.append(nbt.TAG_Byte(name='Y', value=y))
+    section.tags.append(_byte_array('Blocks', bytearray(block_ids)))
+    section.tags.append(_byte_array('Data', _nibbles(block_data)))
+    if add_ids is not None:
+        section.tags.append(_byte_array('Add', _nibbles(add_ids)))
+    return section
+
+def palette_section(y: int, ids: list[int], palette_size: int, version: int) -> nbt.TAG_Compound:
+    """
+    Builds a section holding the given palette indices, without stretching (20w17a and newer),
+    with a palette of ``minecraft:block_0`` to ``minecraft:block_{palette_size - 1}``
+    """
+    bits = max((palette_size - 1).bit_length(), 4)
+    per_long = 64 // bits
+    states = []
+    for start in range(0, 4096, per_long):
+        value = 0
+        for j, palette_id in enumerate(ids[start:start + per_long]):
+            value |= palette_id << (j * bits)
+        states.append(value - 2**64 if value >= 2**63 else value)
+
+    section = nbt.TAG_Compound()
+    section.tags.append(nbt.TAG_Byte(name='Y', value=y))
+    # 21w43a renamed Palette to palette
+    palette = nbt.TAG_List(name='palette' if version >= 2844 else 'Palette', type=nbt.TAG_Compound)
+    for i in range(palette_size):
+        tag = nbt.TAG_Compound()
+        tag.tags.append(nbt.TAG_String(name='Name', value=f'minecraft:block_{i}'))
+        palette.tags.append(tag)
+    block_states = nbt.TAG_Long_Array(name='BlockStates')
+    block_states.value = states
+
+    # 21w39a moved both into a block_states compound
+    if version >= 2836:
+        block_states.name = 'data'
+        container = nbt.TAG_Compound()
+        container.name = 'block_states'
+        container.tags.extend([palette, block_states])
+        section.tags.append(container)
+    else:
+        section.tags.extend([palette, block_states])
+
+    return section
+
+def build_chunk(sections: list[nbt.TAG_Compound], version: int | None = None) -> Chunk:
+    """Builds chunk (0, 0) from the given sections, without a DataVersion if ``version`` is None"""
+    root = nbt.NBTFile()
+    if version is not None:
+        root.tags.append(nbt.TAG_Int(name='DataVersion', value=version))
+    level = nbt.TAG_Compound()
+    level.name = 'Level'
+    level.tags.extend([
+        nbt.TAG_Int(name='xPos', value=0),
+        nbt.TAG_Int(name='zPos', value=0),
+    ])
+    root.tags.append(level)
+
+    # 21w43a moved everything out of Level, Chunk still reads the position from there though
+    if version is not None and version >= 2844:
+        section_list = nbt.TAG_List(name='sections', type=nbt.TAG_Compound)
+        root.tags.append(nbt.TAG_Int(name='yPos', value=min(s['Y'].value for s in sections)))
+        root.tags.append(section_list)
+    else:
+        section_list = nbt.TAG_List(name='Sections', type=nbt.TAG_Compound)
+        level.tags.append(section_list)
+    section_list.tags.extend(sections)
+
+    return Chunk(root)
@@ -1,6 +1,8 @@
 import context as _
-from anvil import Chunk, Region
+import numpy as np
+from anvil import Chunk, Region, EmptyRegion, Block
 from anvil.errors import GZipChunkData, CorruptedData
+from chunk_builder import build_chunk, legacy_section
 
 # TODO: Implement tests for anvil/chunk.py
 #
@@ -11,3 +13,109 @@ from anvil.errors import GZipChunkData, CorruptedData
 #   - A test that attempts to read a chunk from a region that uses GZip compression to ensure the GZipChunkData exception is raised.
 #   - A test that attempts to read a corrupted chunk to ensure the CorruptedData exception is raised.
 #   - Tests for the version-specific logic. This is the most critical and complex part. You would need to create or find region files from different Minecraft versions (especially around the "Flattening" and the 20w17a snapshot) and write tests to ensure that get_block and other methods correctly parse the data.
+
+def test_get_section_ids() -> None:
+    region = EmptyRegion(0, 0)
+    region.set_block(Block('minecraft', 'stone'), 1, 2, 3)
+    region.set_block(Block('minecraft', 'dirt'), 15, 15, 15)
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    ids, palette = chunk.get_section_ids(0)
+    assert ids.shape == (16, 16, 16)
+    assert palette[ids[2, 3, 1]].id == 'stone'
+    assert palette[ids[15, 15, 15]].id == 'dirt'
+    assert sum(palette[i].id == 'air' for i in ids.ravel().tolist()) == 4094
+
+    assert chunk.get_section_ids(1) is None
+
+def test_get_block_entity() -> None:
+    from nbt import nbt
+
+    region = EmptyRegion(0, 0)
+    region.set_block(Block('minecraft', 'chest'), 1, 2, 3)
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    chest = nbt.TAG_Compound()
+    chest.tags.extend([
+        nbt.TAG_String(name='id', value='minecraft:chest'),
+        nbt.TAG_Int(name='x', value=1),
+        nbt.TAG_Int(name='y', value=2),
+        nbt.TAG_Int(name='z', value=3),
+    ])
+    chunk.block_entities.tags.append(chest)
+
+    assert chunk.get_block_entity(1, 2, 3) is chest
+    assert chunk.get_tile_entity(1, 2, 3) is chest
+    assert chunk.get_block_entity(3, 2, 1) is None
+
+def test_get_block_entity_world_coordinates() -> None:
+    from nbt import nbt
+
+    region = EmptyRegion(0, 0)
+    region.set_block(Block('minecraft', 'chest'), 0, 0, 0)
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    # block entities use world coordinates, which can be negative
+    positions = [(-1, -64, -1), (15, -64, -1), (-1, -64, 15), (-30000000, 319, 29999999)]
+    for i, (x, y, z) in enumerate(positions):
+        block_entity = nbt.TAG_Compound()
+        block_entity.tags.extend([
+            nbt.TAG_String(name='id', value=f'minecraft:test_{i}'),
+            nbt.TAG_Int(name='x', value=x),
+            nbt.TAG_Int(name='y', value=y),
+            nbt.TAG_Int(name='z', value=z),
+        ])
+        chunk.block_entities.tags.append(block_entity)
+
+    for i, position in enumerate(positions):
+        assert chunk.get_block_entity(*position)['id'].value == f'minecraft:test_{i}'
+    assert chunk.get_block_entity(15, -64, 15) is None
+
+def test_get_palette_soa() -> None:
+    region = EmptyRegion(0, 0)
+    region.set_block(Block('minecraft', 'chest', {'facing': 'north'}), 1, 2, 3)
+    region.set_block(Block('minecraft', 'chest', {'facing': 'south'}), 4, 5, 6)
+    region.set_block(Block('minecraft', 'stone'), 7, 8, 9)
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    palette = chunk.get_palette_soa(0)
+    assert palette['name'].tolist() == [block.name() for block in chunk.get_palette(0)]
+    assert palette['properties'] == [block.properties for block in chunk.get_palette(0)]
+
+    ids, _ = chunk.get_section_ids(0)
+    chests = np.isin(ids, np.flatnonzero(palette['name'] == 'minecraft:chest'))
+    assert sorted(zip(*np.nonzero(chests))) == [(2, 3, 1), (5, 6, 4)]
+
+def test_no_data_version() -> None:
+    from anvil import OldBlock
+
+    # worlds from before 15w32a have no DataVersion
+    chunk = build_chunk([legacy_section(0, [1] * 4096, [0] * 4096)])
+    assert chunk.version == 0
+    assert chunk.get_block(0, 0, 0) == OldBlock(1)
+    assert all(block == OldBlock(1) for block in chunk.stream_blocks())
+
+    region = EmptyRegion(0, 0)
+    region.add_chunk(chunk)
+    assert Region(region.save()).get_chunk(0, 0).version == 0
+
+def test_get_block_entity_no_aliasing() -> None:
+    from nbt import nbt
+
+    region = EmptyRegion(0, 0)
+    region.set_block(Block('minecraft', 'chest'), 5, 2, 3)
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    chest = nbt.TAG_Compound()
+    chest.tags.extend([
+        nbt.TAG_String(name='id', value='minecraft:chest'),
+        nbt.TAG_Int(name='x', value=5),
+        nbt.TAG_Int(name='y', value=2),
+        nbt.TAG_Int(name='z', value=3),
+    ])
+    chunk.block_entities.tags.append(chest)
+
+    assert chunk.get_block_entity(5 + 2**26, 2, 3) is None
+    assert chunk.get_block_entity(5, 2, 3 - 2**26) is None
+    assert chunk.get_block_entity(5, 2 + 2**26, 3) is None
+    assert chunk.get_block_entity(5.0, 2, 3) is chest
@@ -3,7 +3,7 @@ from anvil.empty_region import EmptyRegion
 from anvil.empty_chunk import EmptyChunk
 import context as _
 import pytest
-from anvil import Region
+from anvil import Region, Chunk
 import io
 import secrets
 
@@ -108,3 +108,40 @@ def test_chunk_data_handle_unicode_decode_error() -> None:
 
 def test_chunk_data_handle_corrupted_data() -> None:
     pass
+
+def test_from_mmap(tmp_path) -> None:
+    empty_region = EmptyRegion(0, 0)
+    empty_region.add_chunk(EmptyChunk(0, 0))
+    contents = empty_region.save()
+
+    filename = tmp_path / "r.0.0.mca"
+    with open(filename, 'wb') as f:
+        f.write(contents)
+
+    region = Region.from_mmap(str(filename))
+    assert region.data[:] == contents
+    assert region.chunk_location(0, 0) == Region(contents).chunk_location(0, 0)
+    assert region.chunk_data(0, 0) is not None
+    assert Chunk.from_region(str(filename), 0, 0).x == 0
+
+def test_from_mmap_empty_file(tmp_path) -> None:
+    filename = tmp_path / "r.0.0.mca"
+    filename.touch()
+
+    with pytest.raises(EmptyRegionFile):
+        Region.from_mmap(filename)
+
+def test_chunk_data_uncompressed() -> None:
+    buffer = io.BytesIO()
+    EmptyChunk(0, 0).save().write_file(buffer=buffer)
+    payload = buffer.getvalue()
+
+    data = bytearray(8192)
+    # chunk (0, 0) is at sector 2 and takes 1 sector
+    data[0:4] = (2 << 8 | 1).to_bytes(4, 'big')
+    data += (len(payload) + 1).to_bytes(4, 'big') + bytes([3]) + payload
+    data += bytes(-len(data) % 4096)
+
+    chunk_data = Region(bytes(data)).chunk_data(0, 0)
+    assert chunk_data is not None
+    assert chunk_data['Level']['xPos'].value == 0
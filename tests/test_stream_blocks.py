@@ -1,5 +1,6 @@
 import context as _
-from anvil import EmptyRegion, Region, Block
+from anvil import EmptyRegion, Region, Block, OldBlock
+from chunk_builder import build_chunk, legacy_section, palette_section
 
 def coord_to_index(x, y, z):
     return y * 16 * 16 + z * 16 + x
@@ -84,3 +85,96 @@ def test_index_5bits():
             assert block.id == blocks[i]
         else:
             assert block.id == 'air'
+
+def test_matches_get_block():
+    from random import choice
+    region = EmptyRegion(0, 0)
+
+    # 40 different blocks takes 6 bits, so some indices are split between two longs
+    blocks = [Block('minecraft', f'block_{i}') for i in range(40)]
+    for y in range(16):
+        for z in range(16):
+            for x in range(16):
+                region.set_block(choice(blocks), x, y, z)
+
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    for i, block in enumerate(chunk.stream_blocks()):
+        x, z, y = i % 16, i // 16 % 16, i // 256
+        assert block == chunk.get_block(x, y, z)
+
+def test_no_stretching():
+    # 20w17a and newer pad each long instead of splitting indices between them
+    ids = [(i * 7) % 17 for i in range(4096)]
+    chunk = build_chunk([palette_section(0, ids, 17, 2586)], 2586)
+
+    for i, block in enumerate(chunk.stream_blocks()):
+        assert block.id == f'block_{ids[i]}'
+        assert block == chunk.get_block(i % 16, i // 256, i // 16 % 16)
+
+def test_block_states_container():
+    ids = [(i * 3) % 5 for i in range(4096)]
+    chunk = build_chunk([palette_section(0, ids, 5, 2836)], 2836)
+
+    for i, block in enumerate(chunk.stream_blocks()):
+        assert block.id == f'block_{ids[i]}'
+        assert block == chunk.get_block(i % 16, i // 256, i // 16 % 16)
+
+def test_single_block_section():
+    region = EmptyRegion(0, 0)
+    for y in range(16):
+        for z in range(16):
+            for x in range(16):
+                region.set_block(Block('minecraft', 'stone'), x, y, z)
+
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    blocks = list(chunk.stream_blocks(index=10))
+    assert len(blocks) == 4096 - 10
+    assert all(block.id == 'stone' for block in blocks)
+    assert chunk.get_block(4, 5, 6).id == 'stone'
+
+def test_pre_flattening():
+    block_ids = [i % 256 for i in range(4096)]
+    block_data = [i % 16 for i in range(4096)]
+    add_ids = [i % 3 for i in range(4096)]
+
+    chunk = build_chunk([legacy_section(0, block_ids, block_data, add_ids)], 1343)
+
+    for i, block in enumerate(chunk.stream_blocks()):
+        assert block == OldBlock(block_ids[i] + (add_ids[i] << 8), block_data[i])
+        assert block == chunk.get_block(i % 16, i // 256, i // 16 % 16)
+
+def test_stream_chunk():
+    region = EmptyRegion(0, 0)
+    region.set_block(Block('minecraft', 'stone'), 1, 0, 0)
+    region.set_block(Block('minecraft', 'dirt'), 2, 20, 3)
+
+    chunk = Region(region.save()).get_chunk(0, 0)
+
+    expected = list(chunk.stream_blocks(section=0)) + list(chunk.stream_blocks(section=1))
+    assert list(chunk.stream_chunk()) == expected
+    assert expected[coord_to_index(1, 0, 0)].id == 'stone'
+    assert expected[4096 + coord_to_index(2, 4, 3)].id == 'dirt'
+
+def test_stream_negative_sections():
+    import pytest
+    from anvil.errors import OutOfBoundsCoordinates
+
+    # 21w06a and newer worlds start at section -4
+    section_ys = range(-4, 2)
+    sections = [palette_section(y, [(i + y) % 5 for i in range(4096)], 5, 3000) for y in section_ys]
+    chunk = build_chunk(sections, 3000)
+
+    assert (chunk.lowest_y, chunk.highest_y) == (-4, 1)
+
+    blocks = list(chunk.stream_chunk())
+    assert len(blocks) == len(section_ys) * 4096
+    expected = [block for y in section_ys for block in chunk.stream_blocks(section=y)]
+    assert blocks == expected
+    assert blocks[0].id == 'block_1'
+    assert chunk.get_block(0, -64, 0) == blocks[0]
+
+    for y in (-5, 2):
+        with pytest.raises(OutOfBoundsCoordinates):
+            list(chunk.stream_blocks(section=y))
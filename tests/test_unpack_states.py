@@ -0,0 +1,26 @@
+import context as _
+import pytest
+import random
+import numpy as np
+from anvil import _fastdecode
+from anvil.utils import unpack_states
+
+@pytest.mark.parametrize('bits', [4, 5, 6, 7, 12])
+@pytest.mark.parametrize('stretches', [True, False])
+def test_kernels_match_numpy(bits: int, stretches: bool, monkeypatch) -> None:
+    if stretches:
+        length = (4096 * bits + 63) // 64
+    else:
+        length = -(-4096 // (64 // bits))
+    states = [random.randint(-2**63, 2**63 - 1) for _ in range(length)]
+
+    monkeypatch.setattr(_fastdecode, 'NUMBA_AVAILABLE', False)
+    expected = unpack_states(states, bits, stretches)
+
+    arr = np.asarray(states, dtype=np.int64).view(np.uint64)
+    if stretches:
+        ids = _fastdecode.decode_stretched(arr, bits)
+    else:
+        ids = _fastdecode.decode_packed(arr, bits)
+
+    assert ids.tolist() == expected.tolist()